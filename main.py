@@ -1,7 +1,11 @@
+import os
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Optional
-from seek_scraper_async_v6 import SeekScraper
+from typing import Optional, Dict
+from seek_scraper_async_v6 import SeekScraper, SELECTORS, posting_time_to_days
+from selector_health import SelectorRegistry
+from time_budget import JobCostEstimator, resolve_deadline, validate_resume_cursor
+from scrape_cache import ScrapeResultCache
 
 # Create FastAPI instance
 app = FastAPI(title="Seek Scraper API",
@@ -13,23 +17,76 @@ class ScraperRequest(BaseModel):
     posted_time_limit: Optional[str] = None
     max_pages: Optional[int] = None
     num_jobs: Optional[int] = None
+    shard: Optional[bool] = False #Split a broad search into smaller ones and scrape them at the same time
+    time_budget: Optional[float] = None #Seconds the scrape may take. Jobs done by then are returned with complete = False
+    deadline: Optional[float] = None #Same as time_budget but as a unix timestamp
+    resume_cursor: Optional[Dict] = None #resume_cursor from an unfinished scrape, to carry on where it stopped
+
+# Identical /scrape calls share one scrape, and finished results are reused for a few minutes
+scrape_cache = ScrapeResultCache(to_days=posting_time_to_days, ttl_seconds=300, max_entries=64)
+
+# Selector hit/miss rates are shared by every scrape, so a selector that broke in one request fails fast in the next
+selector_registry = SelectorRegistry(SELECTORS)
+
+# Job detail pages are recycled once the browser uses more memory than this (MB), so long batches don't get OOM killed
+MAX_BROWSER_RSS_MB = float(os.environ.get('SCRAPER_MAX_RSS_MB', 1500))
+
+# Average time per job from recent scrapes, so a scrape with a deadline knows how many jobs it can fit
+cost_estimator = JobCostEstimator()
 
 # Define the API endpoint
 @app.post("/scrape")
 async def scrape_jobs(request: ScraperRequest):
+    deadline = resolve_deadline(request.deadline, request.time_budget) #Fixed when the request arrives, so browser start up counts against it
+    if request.resume_cursor:
+        try:
+            validate_resume_cursor(request.resume_cursor, sharded=bool(request.shard))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def run_scrape():
+        async with SeekScraper(max_rss_mb=MAX_BROWSER_RSS_MB, selector_registry=selector_registry, cost_estimator=cost_estimator) as scraper:
+            scrape = scraper.scrape_sharded if request.shard else scraper.scrape_jobs
+            try:
+                return await scrape(
+                    request.search_url,
+                    posted_time_limit=request.posted_time_limit,
+                    max_pages=request.max_pages,
+                    num_jobs=request.num_jobs,
+                    deadline=deadline,
+                    resume_cursor=request.resume_cursor
+                )
+            finally:
+                selector_registry.print_report() #Once per request, not once per shard
+
     try:
-        async with SeekScraper() as scraper:
-            jobs_data = await scraper.scrape_jobs(
+        if request.resume_cursor:
+            jobs_data = await run_scrape() #A resumed scrape is only part of a search, so it can't share or fill the cache
+        else:
+            jobs_data = await scrape_cache.get_or_scrape(
                 request.search_url,
-                posted_time_limit=request.posted_time_limit,
+                num_jobs=request.num_jobs,
                 max_pages=request.max_pages,
-                num_jobs=request.num_jobs
+                posted_time_limit=request.posted_time_limit,
+                shard=bool(request.shard),
+                scrape=run_scrape,
+                coalesce=deadline is None #A scrape with a deadline can't wait on one that has none
             )
-            return {"status": "success", "data": jobs_data}
+        complete = getattr(jobs_data, 'complete', True)
+        return {"status": "success" if complete else "partial",
+                "data": jobs_data,
+                "complete": complete,
+                "resume_cursor": getattr(jobs_data, 'resume_cursor', None)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Hit/miss counts for every selector, to spot Seek markup changes
+@app.get("/selector-health")
+async def selector_health():
+    return {"status": "success", "data": selector_registry.report()}
+
+
 # Add a test endpoint
 @app.get("/health-test")
 async def root():
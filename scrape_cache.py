@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from time_budget import ScrapeResult
+
+
+def normalize_search_url(search_url: str) -> str:
+    """Normalize a search URL so equivalent searches share a cache key."""
+    parts = urlsplit(search_url.strip())
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True))) #Query parameters in any order give the same search
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+
+#Cached result of one finished scrape. The params are kept so a smaller request can be answered from it.
+class _CacheEntry:
+    def __init__(self, num_jobs: Optional[int], limit_days: float, jobs: List[Dict], expires_at: float):
+        self.num_jobs = num_jobs
+        self.limit_days = limit_days
+        self.jobs = jobs
+        self.expires_at = expires_at
+
+
+#Shares scrapes between /scrape calls. Identical requests that arrive while a scrape is running wait on
+#that scrape (single-flight) and finished results are kept for ttl_seconds, with the least recently used
+#entry dropped once there are more than max_entries.
+class ScrapeResultCache:
+    def __init__(self, to_days: Callable[[str], float], ttl_seconds: float = 300, max_entries: int = 64):
+        self.to_days = to_days #Converts a "Posted 3d ago" / "1d ago" string to days, same as the scraper does
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, _CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[Tuple, Tuple[Optional[int], float, asyncio.Task]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _limit_days(self, posted_time_limit: Optional[str]) -> float:
+        if not posted_time_limit:
+            return float('inf')
+        return self.to_days(posted_time_limit)
+
+    @staticmethod
+    def _covers(num_jobs: Optional[int], limit_days: float, want_jobs: Optional[int], want_days: float) -> bool:
+        """Check if a scrape with (num_jobs, limit_days) contains every job a (want_jobs, want_days) request would get."""
+        if want_days > limit_days:
+            return False
+        if num_jobs is None:
+            return True
+        return want_jobs is not None and want_jobs <= num_jobs
+
+    def _subset(self, jobs: List[Dict], limit_days: float, want_jobs: Optional[int], want_days: float, sharded: bool = False) -> List[Dict]:
+        """Cut a cached result down to what a smaller request would have returned."""
+        if want_days < limit_days:
+            # The scraper stops at the first job outside the time limit, so the result is the leading run of jobs inside it.
+            # A sharded result is several of those runs merged together, so there every job is checked.
+            subset = []
+            for job in jobs:
+                if self.to_days(job.get('posting_time', '')) > want_days:
+                    if sharded:
+                        continue
+                    break
+                subset.append(job)
+        else:
+            subset = list(jobs)
+
+        if want_jobs is not None:
+            subset = subset[:want_jobs]
+        return subset
+
+    def _lookup(self, base_key: Tuple, want_jobs: Optional[int], want_days: float) -> Optional[List[Dict]]:
+        now = time.monotonic()
+        for key in list(self._entries):
+            entry = self._entries[key]
+            if entry.expires_at <= now:
+                del self._entries[key]
+                continue
+            if key[0] == base_key and self._covers(entry.num_jobs, entry.limit_days, want_jobs, want_days):
+                self._entries.move_to_end(key)
+                return self._subset(entry.jobs, entry.limit_days, want_jobs, want_days, sharded=base_key[2])
+        return None
+
+    def _store(self, key: Tuple, num_jobs: Optional[int], limit_days: float, jobs: List[Dict]):
+        self._entries[key] = _CacheEntry(num_jobs, limit_days, jobs, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_scrape(self,
+                            search_url: str,
+                            num_jobs: Optional[int],
+                            max_pages: Optional[int],
+                            posted_time_limit: Optional[str],
+                            shard: bool,
+                            scrape: Callable[[], Awaitable[List[Dict]]],
+                            coalesce: bool = True) -> List[Dict]:
+        """Return the jobs for a request from the cache, an identical in-flight scrape, or a new scrape.
+
+        With coalesce=False the request never waits on someone else's scrape (e.g. it has its own deadline),
+        but its result is still cached.
+        """
+        num_jobs = num_jobs or None #The scraper treats num_jobs=0 as no limit, so the cache does too
+        max_pages = max_pages or None
+        base_key = (normalize_search_url(search_url), max_pages, shard)
+        want_days = self._limit_days(posted_time_limit)
+        key = (base_key, num_jobs, want_days)
+
+        cached = self._lookup(base_key, num_jobs, want_days)
+        if cached is not None:
+            self.hits += 1
+            print(f"Cache hit for {base_key[0]}")
+            return cached
+
+        for (flight_base, _, _), (flight_jobs, flight_days, task) in list(self._in_flight.items()):
+            if coalesce and flight_base == base_key and self._covers(flight_jobs, flight_days, num_jobs, want_days):
+                self.coalesced += 1
+                print(f"Joining in-flight scrape for {base_key[0]}")
+                jobs = await asyncio.shield(task) #Shielded so a client that disconnects doesn't cancel the scrape for everyone else
+                return ScrapeResult(self._subset(jobs, flight_days, num_jobs, want_days, sharded=shard),
+                                    complete=getattr(jobs, 'complete', True),
+                                    resume_cursor=getattr(jobs, 'resume_cursor', None))
+
+        self.misses += 1
+        task = asyncio.ensure_future(scrape())
+        if coalesce:
+            self._in_flight[key] = (num_jobs, want_days, task)
+
+        def _finish(done: asyncio.Task):
+            if self._in_flight.get(key, (None, None, None))[2] is done:
+                del self._in_flight[key]
+            if done.cancelled() or done.exception() is not None:
+                return
+            jobs = done.result()
+            # An empty list usually means the scrape failed, and a partial one (deadline hit) is missing jobs, so neither is kept
+            if jobs and getattr(jobs, 'complete', True):
+                self._store(key, num_jobs, want_days, jobs)
+
+        task.add_done_callback(_finish)
+        return await asyncio.shield(task)
@@ -1,19 +1,117 @@
 from playwright.async_api import async_playwright
 import time
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 from urllib.parse import urljoin
+from contextlib import asynccontextmanager
+import os
 import re
 import asyncio
-
+from selector_health import SelectorRegistry
+from shard_planner import MAX_PAGE_DEPTH, JOBS_PER_PAGE, JobQuota, fits_under_cap, is_sorted_by_date, merge_shard_results, shard_dimensions
+from time_budget import JobCostEstimator, ScrapeResult, cap_timeout_ms, resolve_deadline, seconds_left, validate_resume_cursor
+
+
+VIEWPORT = {'width': 1920, 'height': 1080}
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Selectors taken from the HTML code. Each field lists its variants in the order they are tried first;
+# the SelectorRegistry promotes whichever one keeps matching.
+SELECTORS = {
+    'job_card': ['article[data-automation="normalJob"]', '[data-automation="jobCard"]'],
+    'total_jobs': ['[data-automation="totalJobsCount"]'],
+    'title': ['[data-automation="job-detail-title"]', '.j1ww7nx7'],
+    'company': ['[data-automation="advertiser-name"]', '.y735df0'],
+    'requirements': ['[data-automation="jobAdDetails"]', '.YCeva_0'],
+    'posting_time': ['[data-automation="jobDetailsPage"] span:has-text("Posted")'],
+}
+
+NO_RESULTS_SELECTOR = '[data-automation="searchZeroResults"]' #Message Seek shows instead of job cards when nothing matches
+
+
+def process_tree_rss_mb(root_pid: int = None) -> Optional[float]:
+    """Return the resident memory (MB) of a process and all its descendants, or None if /proc is unavailable."""
+    root_pid = root_pid or os.getpid()
+    try:
+        children = {} #Maps each parent pid to its child pids, built from /proc/<pid>/stat
+        rss_pages = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    stat = f.read()
+            except OSError: #The process exited while we were walking /proc
+                continue
+            fields = stat[stat.rfind(')') + 2:].split() #The command name can contain spaces, so split after the closing bracket
+            pid = int(entry)
+            children.setdefault(int(fields[1]), []).append(pid)
+            rss_pages[pid] = int(fields[21])
+
+        total_pages = 0
+        pending = [root_pid]
+        while pending: #Walks down the tree: python -> playwright driver -> chromium and its renderers
+            pid = pending.pop()
+            total_pages += rss_pages.get(pid, 0)
+            pending.extend(children.get(pid, []))
+
+        return total_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+
+def posting_time_to_days(posting_time: str) -> float:
+    """Convert a posting time like "Posted 3h ago" or a limit like "1d ago" to days. Unreadable values give infinity."""
+    if not posting_time or 'not found' in posting_time:
+        return float('inf')
+
+    # Remove "Posted" prefix and clean the string
+    cleaned_posted_time = posting_time.lower().replace('posted', '').strip()
+    match = re.match(r'(\d+)\s*([mhd])', cleaned_posted_time)
+    if not match:
+        return float('inf')
+
+    value, unit = match.groups()
+    value = float(value)
+
+    # Convert to days based on unit
+    if unit == 'm':
+        return value / (24 * 60)
+    if unit == 'h':
+        return value / 24
+    return value
 
 
 #It creates a class of functions
 class SeekScraper:
     #First initializes the class with the playwright and the browser
-    def __init__(self): #When defining a class, self ensures that each instance of the class can store and access its own attributes and call its own methods.
+    def __init__(self,
+                 max_navigations_per_context: int = 200,
+                 max_rss_mb: Optional[float] = None,
+                 max_pages_per_context: int = 4,
+                 min_navigations_per_context: int = 20,
+                 selector_registry: SelectorRegistry = None,
+                 cost_estimator: JobCostEstimator = None): #When defining a class, self ensures that each instance of the class can store and access its own attributes and call its own methods.
         self.base_url = "https://www.seek.com.au" #Sets the base URL for the scraper
         self.timeout = 15000
+        self.detail_timeout = 20000
+        self.selectors = selector_registry or SelectorRegistry(SELECTORS) #Pass a shared registry to keep selector health across runs
+        self.cost_estimator = cost_estimator or JobCostEstimator() #Time per job detail fetch, used to plan scrapes with a deadline
+
+        # Lifecycle governor for the job detail pages. Chromium keeps memory from every page a context has
+        # opened, so the detail context is thrown away and rebuilt after N navigations or once the
+        # browser's RSS crosses max_rss_mb. Cookies and local storage are carried over on each recycle.
+        # RSS only triggers a recycle after min_navigations_per_context, so a baseline above the limit
+        # can't make every job page recycle.
+        self.max_navigations_per_context = max_navigations_per_context
+        self.max_rss_mb = max_rss_mb
+        self.min_navigations_per_context = min_navigations_per_context
+        self.max_pages_per_context = max_pages_per_context
+        self.context_recycles = 0
+        self._context_navigations = 0
+        self._open_pages = 0
+        self._page_slots = asyncio.Condition() #Guards the open page count and the recycle of detail_context
 
     #Both enter and exits functions will open the browser and context, and after using it, they will close it.  
     async def __aenter__(self): #The enter function will help use the with statement
@@ -24,28 +122,101 @@ class SeekScraper:
                 '--disable-setuid-sandbox',
                 '--disable-gpu',
                 '--disable-software-rasterizer',]) #Launches google chrome. Headless = FALSE means that the browser will be visible.
-        self.context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            ) #Sets a new context for the browser
+        self.context = await self._new_context() #Sets a new context for the browser. This one only holds the search results page.
         self.page = await self.context.new_page() #Opens a new page in google chrome.
+        self.detail_context = await self._new_context() #Job posts are opened in their own context so it can be recycled without losing the search results page.
         
         return self  
         
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.detail_context.close()
         await self.context.close()
         await self.browser.close()
         await self.playwright.stop()
 
+    async def _new_context(self, storage_state: Dict = None):
+        """Create a browser context with the scraper's viewport and user agent."""
+        return await self.browser.new_context(
+            viewport=VIEWPORT,
+            user_agent=USER_AGENT,
+            storage_state=storage_state
+            )
+
+    def _detail_context_needs_recycle(self) -> bool:
+        """Check if the job detail context has done too many navigations or the browser is using too much memory."""
+        if self.max_navigations_per_context and self._context_navigations >= self.max_navigations_per_context:
+            return True
+        if self.max_rss_mb and self._context_navigations >= self.min_navigations_per_context:
+            rss_mb = process_tree_rss_mb()
+            if rss_mb is not None and rss_mb >= self.max_rss_mb:
+                print(f"Browser RSS at {rss_mb:.0f} MB (limit {self.max_rss_mb:.0f} MB)")
+                return True
+        return False
+
+    async def _recycle_detail_context(self):
+        """Replace the job detail context with a fresh one, keeping its cookies and local storage."""
+        try:
+            storage_state = await self.detail_context.storage_state()
+        except Exception as e:
+            print(f"Could not save context state before recycle: {str(e)}")
+            storage_state = None
+
+        try:
+            await self.detail_context.close()
+        except Exception as e:
+            print(f"Error closing old context: {str(e)}")
+
+        self.detail_context = await self._new_context(storage_state)
+        self._context_navigations = 0
+        self.context_recycles += 1
+        print(f"Recycled job detail context ({self.context_recycles} so far)")
+
+        if self.max_rss_mb:
+            rss_mb = process_tree_rss_mb()
+            if rss_mb is not None and rss_mb >= self.max_rss_mb:
+                # Recycling didn't free enough, so the rest is the browser itself. The next RSS recycle waits for min_navigations_per_context again.
+                print(f"Browser RSS still at {rss_mb:.0f} MB after recycle (limit {self.max_rss_mb:.0f} MB)")
+
+    #Every job post page is opened through here. The page is always closed when the block ends, even if the extraction failed.
+    @asynccontextmanager
+    async def job_page(self):
+        """Open a page in the job detail context, recycling the context first if needed."""
+        async with self._page_slots:
+            while True:
+                # Caps how many job pages can be open at the same time in one context
+                await self._page_slots.wait_for(lambda: self._open_pages < self.max_pages_per_context)
+                if not self._detail_context_needs_recycle():
+                    break
+
+                # Stops handing out pages and waits for the open ones to finish before closing the context under them
+                await self._page_slots.wait_for(lambda: self._open_pages == 0)
+                if self._detail_context_needs_recycle(): #Another page may have recycled the context while this one was waiting
+                    await self._recycle_detail_context()
+
+            page = await self.detail_context.new_page()
+            self._open_pages += 1
+            self._context_navigations += 1
+
+        try:
+            yield page
+        finally:
+            try:
+                await page.close()
+            except Exception as e:
+                print(f"Error closing job page: {str(e)}")
+            async with self._page_slots:
+                self._open_pages -= 1
+                self._page_slots.notify_all()
+
     
     
     #Scroller for the main page to load all the job posts in the first page
-    async def scroll_page(self, page, scroll_delay=0.5): #It sets fist the class instance, the page we are using, and the scroll_delay (this can be changed for faster scrolling)
+    async def scroll_page(self, page, scroll_delay=0.5, deadline: float = None): #It sets fist the class instance, the page we are using, and the scroll_delay (this can be changed for faster scrolling)
         """Scroll the page to load all content."""
         last_height = await page.evaluate('document.documentElement.scrollHeight') #This will give the starting height of the webpage
         
-        while True: #While the last_height is different from the new_height, it will keep scrolling
+        while seconds_left(deadline) != 0: #While the last_height is different from the new_height, it will keep scrolling. Stops at the deadline.
             # Scroll to bottom
             await page.evaluate('window.scrollTo(0, document.documentElement.scrollHeight)')
             await asyncio.sleep(scroll_delay)
@@ -55,6 +226,31 @@ class SeekScraper:
                 break
             last_height = new_height
 
+    #Waits for any variant of a field and records which ones matched, so broken selectors stop costing the full timeout.
+    #Waits that tell us the page has loaded (job cards, result count) pass probe=False and always get the full timeout,
+    #otherwise one empty or slow search would leave every later search with only the probe timeout to load.
+    async def wait_for_field(self, page, field: str, timeout: int, state: str = 'attached', probe: bool = True) -> Optional[str]:
+        """Wait for a field and return the selector variant that matched, or None if none did."""
+        variants = self.selectors.ordered(field)
+        if probe:
+            timeout = self.selectors.timeout_for(field, timeout)
+        try:
+            await page.wait_for_selector(', '.join(variants), timeout=timeout, state=state)
+        except Exception as e:
+            for variant in variants:
+                self.selectors.record(field, variant, found=False)
+            self.selectors.record_field(field, found=False)
+            return None
+
+        matched = None
+        for variant in variants:
+            found = await page.locator(variant).count() > 0
+            self.selectors.record(field, variant, found)
+            if found and matched is None:
+                matched = variant
+        self.selectors.record_field(field, found=matched is not None)
+        return matched
+
     def extract_job_id(self, url: str) -> str:
         """Extract job ID from URL."""
         try:
@@ -74,74 +270,47 @@ class SeekScraper:
     async def extract_job_details(self, job_url: str) -> Dict: #It uses the job_url (the url to the actual job listing) as a string. Dict is used to ask the function to give back a dictionary.
         """Extract details from a single job posting."""
         try:
-            page = await self.context.new_page() #Cause we need to enter each job card, it opens a new page with that link of the job {job_url}
-            await page.goto(job_url) #Now it follows the link to the job post
-            await page.wait_for_load_state('domcontentloaded') #It waits for the page to load. It can be replaced for 'domcontentloaded' if it is faster.
+            async with self.job_page() as page: #Cause we need to enter each job card, it opens a new page with that link of the job {job_url}. The page is closed even if something below fails.
+                await page.goto(job_url) #Now it follows the link to the job post
+                await page.wait_for_load_state('domcontentloaded') #It waits for the page to load. It can be replaced for 'domcontentloaded' if it is faster.
             
-            await self.scroll_page(page) #It scrolls the page in look for the elementes (selectors)
+                await self.scroll_page(page) #It scrolls the page in look for the elementes (selectors)
 
-            job_details = {
-                'url': job_url,  # Adding URL to job details. This adds the job URL to the json outcome
-                'job_id': self.extract_job_id(job_url) #This will extract the job ID from the URL. It uses the extract_job_id function to do so.
-            }
+                job_details = {
+                    'url': job_url,  # Adding URL to job details. This adds the job URL to the json outcome
+                    'job_id': self.extract_job_id(job_url) #This will extract the job ID from the URL. It uses the extract_job_id function to do so.
+                }
 
-            # Selectors taken from the HTML code.
-            #title_selector = '[data-automation="job-detail-title"], .j1ww7nx7'
-            #company_selector = '[data-automation="advertiser-name"], .y735df0'
-            #description_selector = '[data-automation="jobAdDetails"], .YCeva_0'
-            #posting_time_selector = '[data-automation="jobDetailsPage"] span:has-text("Posted")'           
-
-            
-            
-            #Extract job title
-            try:
-                title_selector = '[data-automation="job-detail-title"], .j1ww7nx7'
-                await page.wait_for_selector(title_selector, timeout=20000)
-                title_element = page.locator(title_selector)
-                job_details['title'] = await title_element.inner_text()
-            except Exception as e:
-                job_details['title'] = "Title not found"
-
-            #Extract company name. Same as title_selector
-            try:
-                company_selector = '[data-automation="advertiser-name"], .y735df0'
-                await page.wait_for_selector(company_selector, timeout=20000)
-                company_element = page.locator(company_selector)
-                job_details['company'] = await company_element.inner_text()
-            except Exception as e:
-                job_details['company'] = "Company not found"
-
-            #Extract job requirements. Same as title_selector
-            try:
-                description_selector = '[data-automation="jobAdDetails"], .YCeva_0'
-                await page.wait_for_selector(description_selector, timeout=20000)
-                description_element = page.locator(description_selector)
-                job_details['requirements'] = await description_element.inner_text()
-            except Exception as e:
-                job_details['requirements'] = "Requirements not found"
+                #Extract job title, company name and job requirements. Each one falls back to a "not found" value if no selector matches.
+                for field, missing in (('title', "Title not found"),
+                                       ('company', "Company not found"),
+                                       ('requirements', "Requirements not found")):
+                    try:
+                        selector = await self.wait_for_field(page, field, self.detail_timeout)
+                        job_details[field] = await page.locator(selector).first.inner_text() if selector else missing
+                    except Exception as e:
+                        job_details[field] = missing
 
-            #Trying to extract the element of the HTML code with the word "Posted" in it. This will give the posting time of the job.
+                #Trying to extract the element of the HTML code with the word "Posted" in it. This will give the posting time of the job.
             
-            try:
-                posting_time_selector = '[data-automation="jobDetailsPage"] span:has-text("Posted")'
-                await page.wait_for_selector(posting_time_selector, timeout=20000)
-                posting_elements = await page.locator(posting_time_selector).all()
+                try:
+                    posting_time = "Posting time not found"
+                    posting_time_selector = await self.wait_for_field(page, 'posting_time', self.detail_timeout)
+                    posting_elements = await page.locator(posting_time_selector).all() if posting_time_selector else []
                 
-                posting_time = "Posting time not found"
-                for element in posting_elements:
-                    text = await element.inner_text()
-                    if "Posted" in text and ("ago" in text or "h" in text or "d" in text or "m" in text):
-                        posting_time = text
-                        break
+                    for element in posting_elements:
+                        text = await element.inner_text()
+                        if "Posted" in text and ("ago" in text or "h" in text or "d" in text or "m" in text):
+                            posting_time = text
+                            break
             
-                job_details['posting_time'] = posting_time
+                    job_details['posting_time'] = posting_time
             
-            except Exception as e:
-                job_details['posting_time'] = "Posting time not found"
+                except Exception as e:
+                    job_details['posting_time'] = "Posting time not found"
 
 
-            await page.close()
-            return job_details #This returns all the fields of the job_details dictionary.
+                return job_details #This returns all the fields of the job_details dictionary.
 
         except Exception as e:
             print(f"Error extracting job details: {str(e)}")
@@ -150,8 +319,9 @@ class SeekScraper:
 
 
     #Paginator to go to the next main page. It looks for the next page link using the page-{number} selector. It returns the URL of the next page.
-    async def get_next_page_url(self, current_page: int) -> str: #It takes the current page as variable for starting point ( is set to = 1 after)
+    async def get_next_page_url(self, current_page: int, page=None) -> str: #It takes the current page as variable for starting point ( is set to = 1 after)
         """Get the URL for the next page using the correct page selector."""
+        page = page or self.page #Search page to read the paginator from. Sharded scrapes each have their own.
         try:
             # The next page number will be current_page + 1. This is used to complete the locator for the CSS element in the HTML code.
             next_page_num = current_page + 1
@@ -160,7 +330,7 @@ class SeekScraper:
             next_page_selector = f'[data-automation="page-{next_page_num}"]' #This is the CSS selector for the next buttom in seek.
             
             
-            next_link = await self.page.locator(next_page_selector).first #It uses the locator function to find the next_page_selector in the HTML code.
+            next_link = page.locator(next_page_selector).first #It uses the locator function to find the next_page_selector in the HTML code.
             if next_link and await next_link.is_visible(): #This will check if there is an actual "next" button and if it is visible.
                 href = await next_link.get_attribute('href') #The href is the part of the URL that will change when switching pages "/jobs-in-australia?page=2". This way we retrieve the href to add it after
                 if href:
@@ -174,42 +344,8 @@ class SeekScraper:
             return None
     
     def _convert_to_days(self, posting_time: str) -> float:
-        """Convert posting time to days with logging."""
-        print(f"\nConverting posting time: {posting_time}")
-        
-        try:
-            if not posting_time or 'not found' in posting_time:
-                print("Invalid posting time, returning infinity")
-                return float('inf')
-            
-            # Remove "Posted" prefix and clean the string
-            cleaned_posted_time = posting_time.lower().replace('posted', '').strip()
-            print(f"Cleaned time string: {cleaned_posted_time}")
-
-            match = re.match(r'(\d+)\s*([mhd])', cleaned_posted_time)
-            if not match:
-                print(f"Could not parse time format: {cleaned_posted_time}")
-                return float('inf')
-                        
-            value, unit = match.groups()
-            value = float(value)
-                    
-            # Convert to days based on unit
-            if unit == 'm':
-                days = value / (24 * 60)
-                print(f"Converting {value} minutes to {days:.2f} days")
-            elif unit == 'h':
-                days = value / 24
-                print(f"Converting {value} hours to {days:.2f} days")
-            else:  # unit == 'd'
-                days = value
-                print(f"Already in days: {days}")
-                        
-            return days
-                    
-        except Exception as e:
-            print(f"Error converting time: {str(e)}")
-            return float('inf')
+        """Convert posting time to days."""
+        return posting_time_to_days(posting_time)
     
     def _is_within_time_limit(self, posting_time: str, time_limit: str) -> bool:
         """
@@ -228,104 +364,341 @@ class SeekScraper:
 
     #The actual scraper of each of the job cards. It extracts the job URL and then extracts the job details. I set a maximum of jobs and pages to test it.
     #This fucntion will call the extract_job_details for each job card URL
-    async def scrape_jobs(self, search_url: str, num_jobs: int = None, max_pages: int = None, posted_time_limit: str = None) -> List[Dict]:
+    #With a deadline (epoch seconds) or time_budget (seconds) every page load and wait is cut to the time left, no new page or job is
+    #started once it won't finish in time, and it always returns what it has.
+    async def scrape_jobs(self, search_url: str, num_jobs: int = None, max_pages: int = None, posted_time_limit: str = None, page=None,
+                          deadline: float = None, time_budget: float = None, resume_cursor: Dict = None, job_quota: JobQuota = None) -> ScrapeResult:
+            page = page or self.page #Search page to walk. Defaults to the scraper's own page.
+            deadline = resolve_deadline(deadline, time_budget)
+            if resume_cursor:
+                validate_resume_cursor(resume_cursor, sharded=False)
+
+            all_jobs_data = []
+            failed_urls = [] #Jobs whose page didn't load after every retry. They go in the resume cursor to try again.
+            lost_cards = 0 #Job cards whose link couldn't be read, so they can't be retried
+            # Where the scrape is up to. If it stops early this becomes the resume cursor, so a later call can carry on from the same job card.
+            position = {
+                'search_url': search_url,
+                'page_url': search_url,
+                'page_number': 1,
+                'card_index': 0,
+                'jobs_scraped': 0,
+                'retry_urls': [],
+                'finished': False, #True once every page has been walked and only retry_urls are left
+            }
+            if resume_cursor:
+                position.update(resume_cursor)
+                position['retry_urls'] = list(position['retry_urls'])
+            scraped_before = position['jobs_scraped']
+
+            def jobs_scraped():
+                return scraped_before + len(all_jobs_data)
+
+            def partial_result():
+                print(f"Stopping early with {len(all_jobs_data)} jobs. Resume from page {position['page_number']}, job card {position['card_index']}")
+                cursor = dict(position, jobs_scraped=jobs_scraped(), retry_urls=position['retry_urls'] + failed_urls)
+                return ScrapeResult(all_jobs_data, complete=False, resume_cursor=cursor)
+
+            def finished_result():
+                # Every page was walked, but jobs that failed to load (or lost cards) still make the result incomplete
+                retry_urls = position['retry_urls'] + failed_urls
+                if retry_urls or lost_cards:
+                    print(f"Finished with {len(retry_urls)} jobs to retry and {lost_cards} job cards lost")
+                    cursor = dict(position, jobs_scraped=jobs_scraped(), retry_urls=retry_urls, finished=True)
+                    return ScrapeResult(all_jobs_data, complete=False, resume_cursor=cursor)
+                return ScrapeResult(all_jobs_data)
+
+            async def take_job(job_url):
+                """Fetch one job and keep it. Returns 'kept', 'failed', 'too old' or 'quota full'. Raises asyncio.TimeoutError at the deadline."""
+                # A sharded scrape shares one job count between its shards, so they all stop once there are num_jobs in total
+                if job_quota is not None and not job_quota.claim():
+                    return 'quota full'
+
+                kept = False
+                try:
+                    job_details = await self._fetch_job_details(job_url, deadline)
+                    if not job_details:
+                        failed_urls.append(job_url)
+                        return 'failed'
+                    if posted_time_limit and not self._is_within_time_limit(job_details['posting_time'], posted_time_limit):
+                        return 'too old'
+
+                    all_jobs_data.append(job_details)
+                    kept = True
+                    print(f"Successfully scraped job {jobs_scraped()}")
+                    return 'kept'
+                finally:
+                    if job_quota is not None and not kept:
+                        job_quota.release() #Lets another shard use the slot this job didn't fill
+
             try:
-                print(f"Starting scrape with search URL: {search_url}")
+                # Jobs that failed last time are retried before carrying on with the search
+                for job_url in list(position['retry_urls']):
+                    if not self.cost_estimator.fits(deadline):
+                        return partial_result()
+                    print(f"\nRetrying job: {job_url}")
+                    try:
+                        status = await take_job(job_url)
+                    except asyncio.TimeoutError:
+                        return partial_result()
+                    position['retry_urls'].remove(job_url) #take_job puts it back in failed_urls if it failed again
+                    if status == 'quota full':
+                        return finished_result()
+
+                if position['finished']:
+                    return finished_result()
+
+                print(f"Starting scrape with search URL: {position['page_url']}")
                 
                 # Add retry mechanism for initial page load
                 max_retries = 3
                 for attempt in range(max_retries):
+                    if not self.cost_estimator.fits(deadline):
+                        return partial_result()
                     try:
-                        await self.page.goto(search_url, timeout=self.timeout, wait_until='domcontentloaded')
+                        await page.goto(position['page_url'], timeout=cap_timeout_ms(self.timeout, deadline), wait_until='domcontentloaded')
+
                         # Wait for specific element that indicates page is ready
-                        await self.page.wait_for_selector(
-                            'article[data-automation="normalJob"], [data-automation="jobCard"]',
-                            timeout=self.timeout,
-                            state='visible'
-                        )
-                        break
+                        card_timeout = cap_timeout_ms(self.timeout, deadline)
+                        if await self.wait_for_field(page, 'job_card', card_timeout, state='visible', probe=False):
+                            break
+                        # Only a page that says so counts as the end of the search. A slow or broken page is retried.
+                        if await self._search_has_no_results(page):
+                            print("Search page says there are no results")
+                            return finished_result()
+                        if card_timeout < self.timeout:
+                            return partial_result() #The wait was cut short by the deadline, so the page may just be slow
+                        raise Exception("No job cards found on search page")
                     except Exception as e:
                         print(f"Attempt {attempt + 1} failed: {str(e)}")
                         if attempt == max_retries - 1:
                             raise
-                        await asyncio.sleep(5)
+                        await self._pause(5, deadline)
 
                 # Reduce scroll delay to speed up processing
-                await self.scroll_page(self.page, scroll_delay=0.2)
+                await self.scroll_page(page, scroll_delay=0.2, deadline=deadline)
 
-                all_jobs_data = []
-                current_page = 1
-                jobs_scraped = 0
+                current_page = position['page_number']
+                skip_cards = position['card_index'] #Only the first page of a resumed scrape has cards that were already done
 
                 while True:
                     print(f"\nScraping page {current_page}")
                     
                     # Get all job cards with timeout and retry
                     try:
-                        job_cards = await self.page.locator('article[data-automation="normalJob"], [data-automation="jobCard"]').all()
+                        job_cards = await page.locator(self.selectors.selector('job_card')).all()
                         print(f"Found {len(job_cards)} job cards on page {current_page}")
+                    except Exception as e:
+                        print(f"Error getting job cards: {str(e)}")
+                        return partial_result()
+
+                    for card_index, card in enumerate(job_cards):
+                        if card_index < skip_cards:
+                            continue
+                        position.update(page_number=current_page, card_index=card_index)
 
-                        for card in job_cards:
-                            if num_jobs and jobs_scraped >= num_jobs:
-                                return all_jobs_data
-
-                            try:
-                                # Get link with explicit wait
-                                link_element = card.locator('a').first
-                                href = await link_element.get_attribute('href', timeout=5000)
-                                if not href:
-                                    continue
-
-                                job_url = urljoin(self.base_url, str(href))
-                                print(f"\nProcessing job {jobs_scraped + 1}: {job_url}")
-
-                                # Add retry mechanism for job details
-                                for detail_attempt in range(3):
-                                    try:
-                                        job_details = await self.extract_job_details(job_url)
-                                        if job_details:
-                                            break
-                                    except Exception as e:
-                                        print(f"Job detail attempt {detail_attempt + 1} failed: {str(e)}")
-                                        await asyncio.sleep(2)
-
-                                if job_details:
-                                    if posted_time_limit and not self._is_within_time_limit(job_details['posting_time'], posted_time_limit):
-                                        return all_jobs_data
-
-                                    all_jobs_data.append(job_details)
-                                    jobs_scraped += 1
-                                    print(f"Successfully scraped job {jobs_scraped}")
-                                
-                            except Exception as e:
-                                print(f"Error processing job card: {str(e)}")
+                        if num_jobs and jobs_scraped() >= num_jobs:
+                            return finished_result()
+
+                        # Doesn't start a job that won't finish before the deadline
+                        if not self.cost_estimator.fits(deadline):
+                            return partial_result()
+
+                        try:
+                            # Get link with explicit wait
+                            link_element = card.locator('a').first
+                            href = await link_element.get_attribute('href', timeout=cap_timeout_ms(5000, deadline))
+                            if not href:
                                 continue
 
-                    except Exception as e:
-                        print(f"Error getting job cards: {str(e)}")
-                        break
+                            job_url = urljoin(self.base_url, str(href))
+                            print(f"\nProcessing job {jobs_scraped() + 1}: {job_url}")
+
+                            status = await take_job(job_url)
+                            if status in ('too old', 'quota full'):
+                                return finished_result()
+
+                        except asyncio.TimeoutError:
+                            print(f"Deadline reached while extracting job {card_index + 1} on page {current_page}")
+                            return partial_result()
+                        except Exception as e:
+                            print(f"Error processing job card: {str(e)}")
+                            lost_cards += 1
+                            continue
 
                     if max_pages and current_page >= max_pages:
-                        break
+                        return finished_result()
+
+                    # Every card on this page is done, so a resume reloads it and goes straight to the next page
+                    position.update(card_index=len(job_cards))
+                    if not self.cost_estimator.fits(deadline):
+                        return partial_result()
 
                     # Get next page with retry
                     try:
-                        next_page_url = await self.get_next_page_url(current_page)
+                        next_page_url = await self.get_next_page_url(current_page, page)
                         if not next_page_url:
-                            break
+                            return finished_result()
 
-                        await self.page.goto(next_page_url, timeout=self.timeout, wait_until='domcontentloaded')
-                        await asyncio.sleep(2)
+                        position.update(page_url=next_page_url, page_number=current_page + 1, card_index=0)
+                        await page.goto(next_page_url, timeout=cap_timeout_ms(self.timeout, deadline), wait_until='domcontentloaded')
+                        await self._pause(2, deadline)
                         current_page += 1
+                        skip_cards = 0
                     except Exception as e:
                         print(f"Error navigating to next page: {str(e)}")
-                        break
-
-                return all_jobs_data
+                        return partial_result()
 
             except Exception as e:
                 print(f"Error in scrape_jobs: {str(e)}")
-                return []
+                return partial_result() #Keeps the jobs already extracted instead of throwing them away
+
+    async def _search_has_no_results(self, page) -> bool:
+        """Check if a loaded search page shows Seek's no results message or a result count of 0."""
+        try:
+            if await page.locator(NO_RESULTS_SELECTOR).count():
+                return True
+            count = page.locator(self.selectors.selector('total_jobs')).first
+            if await count.count():
+                return re.sub(r'[^\d]', '', await count.inner_text()) == '0'
+        except Exception as e:
+            print(f"Error checking for an empty search: {str(e)}")
+        return False
+
+    async def _fetch_job_details(self, job_url: str, deadline: float = None) -> Optional[Dict]:
+        """Fetch a job post with retries. Returns None if every attempt failed, raises asyncio.TimeoutError at the deadline."""
+        for detail_attempt in range(3):
+            try:
+                started = time.time()
+                job_details = await asyncio.wait_for(self.extract_job_details(job_url), timeout=seconds_left(deadline))
+                if job_details:
+                    self.cost_estimator.record(time.time() - started)
+                    return job_details
+            except asyncio.TimeoutError:
+                print(f"Deadline reached while extracting {job_url}")
+                raise
+            except Exception as e:
+                print(f"Job detail attempt {detail_attempt + 1} failed: {str(e)}")
+                await self._pause(2, deadline)
+        return None
+
+    async def _pause(self, seconds: float, deadline: float = None):
+        """Sleep, but never past the deadline."""
+        left = seconds_left(deadline)
+        await asyncio.sleep(seconds if left is None else min(seconds, left))
+
+    #Reads the "1,234 jobs" count at the top of a search. Used to decide if a search fits under Seek's page cap.
+    async def get_result_count(self, search_url: str, deadline: float = None) -> Optional[int]:
+        """Return the total number of jobs a search has, or None if it can't be read."""
+        page = await self.context.new_page()
+        try:
+            await page.goto(search_url, timeout=cap_timeout_ms(self.timeout, deadline), wait_until='domcontentloaded')
+            selector = await self.wait_for_field(page, 'total_jobs', cap_timeout_ms(self.timeout, deadline), probe=False)
+            if not selector:
+                return None
+            digits = re.sub(r'[^\d]', '', await page.locator(selector).first.inner_text())
+            return int(digits) if digits else None
+        except Exception as e:
+            print(f"Error reading result count for {search_url}: {str(e)}")
+            return None
+        finally:
+            await page.close()
+
+    #Splits a broad search into disjoint sub-searches (by state, then work type, then classification) until each one fits under the page cap.
+    #With a deadline it stops splitting once there's no time left for another job, and the searches planned so far are scraped as they are.
+    async def plan_shards(self, search_url: str, max_jobs_per_shard: int = MAX_PAGE_DEPTH * JOBS_PER_PAGE,
+                          classifications: List[str] = None, max_concurrency: int = 3, deadline: float = None) -> List[str]:
+        """Return sub-search URLs that together cover search_url and each have at most max_jobs_per_shard results."""
+        dimensions = shard_dimensions(classifications)
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def count(url):
+            async with slots:
+                return await self.get_result_count(url, deadline=deadline)
+
+        shards = []
+        level = [(search_url, 0)] #(url, index of the next dimension to split it by)
+        while level:
+            if not self.cost_estimator.fits(deadline):
+                print(f"Out of time while planning, scraping {len(level)} searches without splitting them further")
+                shards.extend(url for url, _ in level)
+                break
+            counts = await asyncio.gather(*(count(url) for url, _ in level))
+            next_level = []
+            for (url, dimension), total in zip(level, counts):
+                if total == 0:
+                    continue
+                if total is None or total <= max_jobs_per_shard:
+                    shards.append(url) #Fits under the cap, or the count couldn't be read so it is scraped as it is
+                    continue
+
+                children = []
+                while not children and dimension < len(dimensions):
+                    name, split = dimensions[dimension]
+                    children = split(url)
+                    dimension += 1
+                if not children:
+                    print(f"Can't split {url} any further ({total} jobs), some jobs will be missed")
+                    shards.append(url)
+                    continue
+
+                print(f"Splitting {url} ({total} jobs) by {name} into {len(children)} searches")
+                next_level.extend((child, dimension) for child in children)
+            level = next_level
+
+        print(f"Planned {len(shards)} searches for {search_url}")
+        return shards
+
+    #Scrapes a broad search by running its shards at the same time, each on its own search page, and merging the results.
+    async def scrape_sharded(self, search_url: str, num_jobs: int = None, max_pages: int = None, posted_time_limit: str = None,
+                             classifications: List[str] = None, max_concurrency: int = 3,
+                             deadline: float = None, time_budget: float = None, resume_cursor: Dict = None) -> ScrapeResult:
+        """Scrape a search that may be bigger than Seek's page cap, deduplicating jobs by job_id."""
+        deadline = resolve_deadline(deadline, time_budget)
+
+        # A resumed scrape carries on the shards that didn't finish last time, so the search isn't planned again.
+        # num_jobs counts the jobs from earlier calls too, same as a resumed scrape_jobs.
+        scraped_before = 0
+        if resume_cursor:
+            validate_resume_cursor(resume_cursor, sharded=True)
+            shard_cursors = resume_cursor['shards'] if 'shards' in resume_cursor else [resume_cursor] #A cursor from an unsharded scrape is one shard
+            shard_runs = [(cursor['search_url'], cursor) for cursor in shard_cursors]
+            # Finished shards aren't in the cursor any more, so the sharded cursor keeps the total itself
+            scraped_before = resume_cursor.get('jobs_scraped', sum(cursor['jobs_scraped'] for cursor in shard_cursors))
+        elif fits_under_cap(num_jobs, max_pages):
+            shard_runs = [(search_url, None)] #Never goes past the page cap, so splitting would only cost count page loads
+        else:
+            shards = await self.plan_shards(search_url, classifications=classifications, max_concurrency=max_concurrency, deadline=deadline)
+            shard_runs = [(shard_url, None) for shard_url in shards or [search_url]]
+
+        slots = asyncio.Semaphore(max_concurrency)
+        shard_max_pages = max_pages
+        job_limit = num_jobs
+        if len(shard_runs) > 1 and max_pages:
+            # Page numbers of the original search don't map onto the shards, so max_pages becomes a job budget shared by all of them
+            shard_max_pages = None
+            job_limit = min(num_jobs or max_pages * JOBS_PER_PAGE, max_pages * JOBS_PER_PAGE)
+        if job_limit and scraped_before >= job_limit:
+            return ScrapeResult([]) #Earlier calls already got every job that was asked for
+        job_quota = JobQuota(job_limit, claimed=scraped_before)
+
+        async def scrape_shard(shard_url, shard_cursor):
+            async with slots:
+                page = await self.context.new_page()
+                try:
+                    return await self.scrape_jobs(shard_url, max_pages=shard_max_pages, posted_time_limit=posted_time_limit, page=page,
+                                                  deadline=deadline, resume_cursor=shard_cursor, job_quota=job_quota)
+                finally:
+                    await page.close()
+
+        results = await asyncio.gather(*(scrape_shard(shard_url, shard_cursor) for shard_url, shard_cursor in shard_runs))
+        all_jobs_data = merge_shard_results(results, newest_first=is_sorted_by_date(search_url), to_days=posting_time_to_days)
+
+        unfinished = [result.resume_cursor for result in results if not result.complete]
+        print(f"Merged {len(all_jobs_data)} unique jobs from {len(shard_runs)} searches ({len(unfinished)} unfinished)")
+        return ScrapeResult(all_jobs_data[:num_jobs] if num_jobs else all_jobs_data,
+                            complete=not unfinished,
+                            resume_cursor={'shards': unfinished, 'jobs_scraped': scraped_before + len(all_jobs_data)} if unfinished else None)
 
     async def save_to_json(self, jobs_data: List[Dict], filename: str = 'seek_jobs_v3.json'):
         """Save scraped data to JSON file."""
@@ -354,6 +727,7 @@ async def main():
     async with SeekScraper() as scraper:
       
         jobs_data = await scraper.scrape_jobs(search_url, posted_time_limit="1d ago", max_pages=2)
+        scraper.selectors.print_report() #Shows which selectors are missing, so a markup change is easy to spot
         if jobs_data:
             await scraper.save_to_json(jobs_data)
             print(f"\nScraped {len(jobs_data)} jobs successfully!")
@@ -0,0 +1,102 @@
+from typing import Dict, List
+
+
+#Hit/miss counters for one selector variant (e.g. '.j1ww7nx7')
+class _SelectorStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.consecutive_misses = 0
+
+    @property
+    def miss_rate(self) -> float:
+        tries = self.hits + self.misses
+        return self.misses / tries if tries else 0.0
+
+
+#Tracks which selector variants are working for each field across a run. The variant that keeps matching is
+#tried first, and once every variant of a field has missed failure_threshold times in a row the field only
+#gets a short probe timeout instead of the full wait, so a markup change shows up as fast "not found" values.
+#Every full_probe_every-th wait on a failing field still gets the full timeout, so a selector that was only
+#slow can recover.
+class SelectorRegistry:
+    def __init__(self, fields: Dict[str, List[str]], failure_threshold: int = 3, probe_timeout: int = 2000, full_probe_every: int = 20):
+        self.fields = {field: list(variants) for field, variants in fields.items()}
+        self.failure_threshold = failure_threshold
+        self.probe_timeout = probe_timeout
+        self.full_probe_every = full_probe_every
+        self._probes = {field: 0 for field in self.fields}
+        self._stats = {field: {variant: _SelectorStats() for variant in variants} for field, variants in self.fields.items()}
+        self._field_hits = {field: 0 for field in self.fields}
+        self._field_misses = {field: 0 for field in self.fields}
+
+    def is_failing(self, field: str, variant: str) -> bool:
+        return self._stats[field][variant].consecutive_misses >= self.failure_threshold
+
+    def ordered(self, field: str) -> List[str]:
+        """Return the variants of a field with the working ones first, best hit rate first."""
+        return sorted(
+            self.fields[field],
+            key=lambda variant: (self.is_failing(field, variant), self._stats[field][variant].miss_rate)
+        ) #sorted is stable, so untried variants keep the order they were registered in
+
+    def selector(self, field: str) -> str:
+        """Return one CSS selector matching any variant of the field, in promoted order."""
+        return ', '.join(self.ordered(field))
+
+    def timeout_for(self, field: str, timeout: int) -> int:
+        """Return the full timeout while any variant still works, or the probe timeout once all of them are failing."""
+        if not all(self.is_failing(field, variant) for variant in self.fields[field]):
+            self._probes[field] = 0
+            return timeout
+
+        self._probes[field] += 1
+        if self._probes[field] % self.full_probe_every == 0:
+            return timeout
+        return min(timeout, self.probe_timeout)
+
+    def record(self, field: str, variant: str, found: bool):
+        stats = self._stats[field][variant]
+        if found:
+            stats.hits += 1
+            stats.consecutive_misses = 0
+        else:
+            stats.misses += 1
+            stats.consecutive_misses += 1
+
+    def record_field(self, field: str, found: bool):
+        """Record whether any variant of the field matched on a page."""
+        if found:
+            self._field_hits[field] += 1
+        else:
+            self._field_misses[field] += 1
+
+    def report(self) -> Dict:
+        """Return hit/miss counts and miss rates per field and per variant."""
+        report = {}
+        for field, variants in self.fields.items():
+            hits, misses = self._field_hits[field], self._field_misses[field]
+            report[field] = {
+                'hits': hits,
+                'misses': misses,
+                'miss_rate': misses / (hits + misses) if hits + misses else 0.0,
+                'variants': {
+                    variant: {
+                        'hits': self._stats[field][variant].hits,
+                        'misses': self._stats[field][variant].misses,
+                        'miss_rate': self._stats[field][variant].miss_rate,
+                        'failing': self.is_failing(field, variant),
+                    }
+                    for variant in variants
+                },
+            }
+        return report
+
+    def print_report(self):
+        print("\nSelector health:")
+        for field, stats in self.report().items():
+            flag = "  <-- FAILING" if stats['misses'] and stats['hits'] == 0 else ""
+            print(f"  {field}: {stats['hits']} found, {stats['misses']} missed ({stats['miss_rate']:.0%} miss rate){flag}")
+            for variant, variant_stats in stats['variants'].items():
+                print(f"    {variant}: {variant_stats['hits']} hits, {variant_stats['misses']} misses"
+                      f"{' (failing)' if variant_stats['failing'] else ''}")
@@ -0,0 +1,126 @@
+from itertools import zip_longest
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import re
+
+
+# Seek only lets you page so far into one search, so a search with more results than this has to be
+# split into smaller searches that each fit under the cap.
+MAX_PAGE_DEPTH = 25
+JOBS_PER_PAGE = 22
+
+# Disjoint ways of splitting one search. Each job ad has a single state and a single work type, so the
+# sub-searches never overlap and together cover the whole search.
+STATE_LOCATIONS = [
+    'New-South-Wales-NSW',
+    'Victoria-VIC',
+    'Queensland-QLD',
+    'Western-Australia-WA',
+    'South-Australia-SA',
+    'Australian-Capital-Territory-ACT',
+    'Tasmania-TAS',
+    'Northern-Territory-NT',
+]
+WORK_TYPES = ['242', '243', '244', '245'] #Full time, part time, contract/temp, casual/vacation
+
+_LOCATION_PATH = re.compile(r'/in-([^/?]+)')
+_SEARCH_PATH = re.compile(r'^/(?:[^/]+-)?jobs(?:/in-[^/]+)?/?$') #/jobs or /<keywords>-jobs, optionally followed by /in-<location>
+
+
+def fits_under_cap(num_jobs: Optional[int], max_pages: Optional[int]) -> bool:
+    """Check if a scrape limited by num_jobs or max_pages can never go past Seek's page cap, so it doesn't need splitting."""
+    return bool((max_pages and max_pages <= MAX_PAGE_DEPTH) or (num_jobs and num_jobs <= MAX_PAGE_DEPTH * JOBS_PER_PAGE))
+
+
+def is_sorted_by_date(search_url: str) -> bool:
+    return ('sortmode', 'ListedDate') in parse_qsl(urlsplit(search_url).query)
+
+
+def _set_query_param(search_url: str, name: str, value: str) -> str:
+    parts = urlsplit(search_url)
+    query = [(key, val) for key, val in parse_qsl(parts.query, keep_blank_values=True) if key not in (name, 'page')]
+    query.append((name, value))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+def _has_query_param(search_url: str, name: str) -> bool:
+    return any(key == name for key, _ in parse_qsl(urlsplit(search_url).query))
+
+
+def split_by_location(search_url: str) -> List[str]:
+    """Split an Australia-wide search into one search per state. Returns [] if the search is already narrower."""
+    parts = urlsplit(search_url)
+    if not _SEARCH_PATH.match(parts.path): #Paths like /jobs-in-australia aren't a search Seek can narrow by adding /in-<state>
+        return []
+    match = _LOCATION_PATH.search(parts.path)
+    if match and match.group(1) != 'All-Australia':
+        return []
+    if _has_query_param(search_url, 'where'):
+        return []
+
+    shards = []
+    for location in STATE_LOCATIONS:
+        if match:
+            path = parts.path[:match.start()] + f'/in-{location}' + parts.path[match.end():]
+        else:
+            path = parts.path.rstrip('/') + f'/in-{location}' #e.g. /data-analyst-jobs -> /data-analyst-jobs/in-Victoria-VIC
+        query = urlencode([(key, val) for key, val in parse_qsl(parts.query, keep_blank_values=True) if key != 'page'])
+        shards.append(urlunsplit((parts.scheme, parts.netloc, path, query, '')))
+    return shards
+
+
+def split_by_query_param(search_url: str, name: str, values: Sequence[str]) -> List[str]:
+    """Split a search into one search per value of a query parameter. Returns [] if the parameter is already set."""
+    if not values or _has_query_param(search_url, name):
+        return []
+    return [_set_query_param(search_url, name, value) for value in values]
+
+
+def shard_dimensions(classifications: Optional[Sequence[str]] = None) -> List[Tuple[str, callable]]:
+    """Return the (name, splitter) pairs to try, in order, when a search is too big."""
+    dimensions = [
+        ('location', split_by_location),
+        ('work type', lambda url: split_by_query_param(url, 'worktype', WORK_TYPES)),
+    ]
+    if classifications: #Seek's classification ids change now and then, so they are passed in rather than hard coded
+        dimensions.append(('classification', lambda url: split_by_query_param(url, 'classification', classifications)))
+    return dimensions
+
+
+#Number of jobs a sharded scrape still wants, shared by all its shards. A shard claims a slot before fetching
+#a job and gives it back if the job isn't kept, so the shards stop together once num_jobs jobs are in.
+#A resumed scrape starts with claimed set to the jobs it already got, so num_jobs is a total across calls.
+class JobQuota:
+    def __init__(self, limit: Optional[int], claimed: int = 0):
+        self.limit = limit
+        self.claimed = claimed
+
+    def claim(self) -> bool:
+        if self.limit and self.claimed >= self.limit:
+            return False
+        self.claimed += 1
+        return True
+
+    def release(self):
+        self.claimed -= 1
+
+
+def merge_shard_results(results: Sequence[List[Dict]], newest_first: bool, to_days: Callable[[str], float]) -> List[Dict]:
+    """Merge the jobs from each shard, dropping duplicate job_ids.
+
+    A search sorted by listed date is merged newest first. Otherwise the shards are interleaved so no single
+    shard (e.g. the first state) fills the front of the list.
+    """
+    if newest_first:
+        jobs = sorted((job for jobs_data in results for job in jobs_data), key=lambda job: to_days(job.get('posting_time', ''))) #sorted is stable, so ties keep shard order
+    else:
+        jobs = [job for round_jobs in zip_longest(*results) for job in round_jobs if job is not None]
+
+    merged = []
+    seen_ids = set()
+    for job in jobs:
+        if job['job_id'] in seen_ids:
+            continue
+        seen_ids.add(job['job_id'])
+        merged.append(job)
+    return merged
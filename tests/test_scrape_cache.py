@@ -0,0 +1,171 @@
+import asyncio
+import re
+
+from scrape_cache import ScrapeResultCache, normalize_search_url
+from time_budget import ScrapeResult
+
+
+def to_days(posting_time):
+    match = re.search(r'(\d+)\s*([mhd])', (posting_time or '').lower())
+    if not match:
+        return float('inf')
+    value = float(match.group(1))
+    return {'m': value / 1440, 'h': value / 24, 'd': value}[match.group(2)]
+
+
+def make_jobs(days):
+    return [{'job_id': str(i), 'posting_time': f'Posted {d}d ago'} for i, d in enumerate(days)]
+
+
+class FakeScrape:
+    def __init__(self, jobs, delay=0.01):
+        self.jobs = jobs
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.jobs
+
+
+def get(cache, scrape, num_jobs=None, max_pages=None, posted_time_limit=None, url='https://www.seek.com.au/data-jobs', shard=False, coalesce=True):
+    return cache.get_or_scrape(url, num_jobs=num_jobs, max_pages=max_pages, posted_time_limit=posted_time_limit,
+                               shard=shard, scrape=scrape, coalesce=coalesce)
+
+
+def test_normalize_search_url_ignores_param_order_case_and_trailing_slash():
+    assert normalize_search_url('https://WWW.seek.com.au/data-jobs/?b=2&a=1') == \
+        normalize_search_url('https://www.seek.com.au/data-jobs?a=1&b=2')
+
+
+def test_concurrent_identical_requests_share_one_scrape():
+    async def run():
+        cache = ScrapeResultCache(to_days)
+        scrape = FakeScrape(make_jobs([0, 1, 2]))
+        results = await asyncio.gather(*(get(cache, scrape) for _ in range(4)))
+        return scrape.calls, [len(r) for r in results]
+
+    assert asyncio.run(run()) == (1, [3, 3, 3, 3])
+
+
+def test_smaller_request_is_answered_from_cache():
+    async def run():
+        cache = ScrapeResultCache(to_days)
+        scrape = FakeScrape(make_jobs([0, 1, 2, 3, 4]))
+        await get(cache, scrape, num_jobs=5)
+        subset = await get(cache, scrape, num_jobs=2)
+        bigger = await get(cache, scrape, num_jobs=10)
+        return scrape.calls, subset, len(bigger)
+
+    calls, subset, bigger = asyncio.run(run())
+    assert calls == 2
+    assert [job['job_id'] for job in subset] == ['0', '1']
+    assert bigger == 5
+
+
+def test_tighter_time_limit_stops_at_first_older_job():
+    async def run():
+        cache = ScrapeResultCache(to_days)
+        scrape = FakeScrape(make_jobs([0, 1, 5, 1]))
+        await get(cache, scrape)
+        return scrape.calls, await get(cache, scrape, posted_time_limit='2d ago')
+
+    calls, subset = asyncio.run(run())
+    assert calls == 1
+    assert [job['job_id'] for job in subset] == ['0', '1']
+
+
+def test_tighter_time_limit_filters_every_job_when_sharded():
+    async def run():
+        cache = ScrapeResultCache(to_days)
+        scrape = FakeScrape(make_jobs([0, 5, 1]))
+        await get(cache, scrape, shard=True)
+        return await get(cache, scrape, posted_time_limit='2d ago', shard=True)
+
+    assert [job['job_id'] for job in asyncio.run(run())] == ['0', '2']
+
+
+def test_looser_time_limit_is_not_served_from_cache():
+    async def run():
+        cache = ScrapeResultCache(to_days)
+        scrape = FakeScrape(make_jobs([0]))
+        await get(cache, scrape, posted_time_limit='1d ago')
+        await get(cache, scrape)
+        return scrape.calls
+
+    assert asyncio.run(run()) == 2
+
+
+def test_num_jobs_zero_means_no_limit():
+    async def run():
+        cache = ScrapeResultCache(to_days)
+        scrape = FakeScrape(make_jobs(range(10)))
+        await get(cache, scrape, num_jobs=None)
+        return scrape.calls, await get(cache, scrape, num_jobs=0)
+
+    calls, jobs = asyncio.run(run())
+    assert calls == 1
+    assert len(jobs) == 10
+
+
+def test_expired_entries_are_scraped_again():
+    async def run():
+        cache = ScrapeResultCache(to_days, ttl_seconds=0)
+        scrape = FakeScrape(make_jobs([0]))
+        await get(cache, scrape)
+        await get(cache, scrape)
+        return scrape.calls
+
+    assert asyncio.run(run()) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    async def run():
+        cache = ScrapeResultCache(to_days, max_entries=2)
+        scrape = FakeScrape(make_jobs([0]))
+        await get(cache, scrape, url='https://www.seek.com.au/a-jobs')
+        await get(cache, scrape, url='https://www.seek.com.au/b-jobs')
+        await get(cache, scrape, url='https://www.seek.com.au/a-jobs') #a is now the most recently used
+        await get(cache, scrape, url='https://www.seek.com.au/c-jobs')
+        await get(cache, scrape, url='https://www.seek.com.au/a-jobs')
+        await get(cache, scrape, url='https://www.seek.com.au/b-jobs')
+        return scrape.calls
+
+    assert asyncio.run(run()) == 4
+
+
+def test_partial_and_empty_results_are_not_cached():
+    async def run():
+        cache = ScrapeResultCache(to_days)
+        partial = FakeScrape(ScrapeResult(make_jobs([0]), complete=False, resume_cursor={'page_number': 2}))
+        await get(cache, partial)
+        await get(cache, partial)
+        empty = FakeScrape([])
+        await get(cache, empty, url='https://www.seek.com.au/other-jobs')
+        await get(cache, empty, url='https://www.seek.com.au/other-jobs')
+        return partial.calls, empty.calls
+
+    assert asyncio.run(run()) == (2, 2)
+
+
+def test_joining_a_partial_scrape_keeps_the_completeness_flag():
+    async def run():
+        cache = ScrapeResultCache(to_days)
+        scrape = FakeScrape(ScrapeResult(make_jobs([0, 1]), complete=False, resume_cursor={'page_number': 2}))
+        return await asyncio.gather(get(cache, scrape), get(cache, scrape, num_jobs=1))
+
+    first, joined = asyncio.run(run())
+    assert len(joined) == 1
+    assert joined.complete is False
+    assert joined.resume_cursor == {'page_number': 2}
+
+
+def test_no_coalesce_runs_its_own_scrape():
+    async def run():
+        cache = ScrapeResultCache(to_days)
+        scrape = FakeScrape(make_jobs([0]))
+        await asyncio.gather(get(cache, scrape), get(cache, scrape, coalesce=False))
+        return scrape.calls
+
+    assert asyncio.run(run()) == 2
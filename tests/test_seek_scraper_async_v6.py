@@ -0,0 +1,315 @@
+import asyncio
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+pytest.importorskip('playwright.async_api') #The scraper module imports playwright, but these tests never start a browser
+
+import seek_scraper_async_v6
+from seek_scraper_async_v6 import NO_RESULTS_SELECTOR, SeekScraper
+
+
+#Search results page with pages_per_search pages of jobs_per_page job cards. The job links include the search
+#path, so every search (shard) has its own jobs. With cards_load=False the job cards never show up, and the
+#page can show Seek's no results message or a result count instead.
+class FakeSearchPage:
+    def __init__(self, pages_per_search=2, jobs_per_page=3, cards_load=True, shows_no_results=False, total_jobs='1,234 jobs'):
+        self.pages_per_search = pages_per_search
+        self.jobs_per_page = jobs_per_page
+        self.cards_load = cards_load
+        self.shows_no_results = shows_no_results
+        self.total_jobs = total_jobs
+        self.url = ''
+        self.page_number = 1
+        self.loads = 0
+
+    async def goto(self, url, timeout=None, wait_until=None):
+        self.url = url
+        self.page_number = int(dict(parse_qsl(urlsplit(url).query)).get('page', 1))
+        self.loads += 1
+
+    async def wait_for_selector(self, selector, timeout=None, state=None):
+        if not self.cards_load:
+            raise Exception(f"Timeout {timeout}ms exceeded")
+
+    async def evaluate(self, script):
+        return 1000
+
+    def locator(self, selector):
+        return FakeLocator(self, selector)
+
+    async def close(self):
+        pass
+
+    def job_links(self):
+        path = urlsplit(self.url).path.strip('/').replace('/', '-')
+        return [f'/job/{path}-{self.page_number}-{i}' for i in range(self.jobs_per_page)]
+
+
+class FakeLocator:
+    def __init__(self, page, selector):
+        self.page = page
+        self.selector = selector
+
+    @property
+    def first(self):
+        return self
+
+    async def count(self):
+        if self.selector == NO_RESULTS_SELECTOR:
+            return int(self.page.shows_no_results)
+        return 1
+
+    async def inner_text(self):
+        return self.page.total_jobs
+
+    async def all(self):
+        return [FakeJobCard(link) for link in self.page.job_links()]
+
+    async def is_visible(self):
+        return self.page.page_number < self.page.pages_per_search
+
+    async def get_attribute(self, name, timeout=None):
+        return f'{urlsplit(self.page.url).path}?page={self.page.page_number + 1}'
+
+
+class FakeJobCard:
+    def __init__(self, link):
+        self.link = link
+
+    def locator(self, selector):
+        return self
+
+    @property
+    def first(self):
+        return self
+
+    async def get_attribute(self, name, timeout=None):
+        return self.link
+
+
+class FakeSearchContext:
+    def __init__(self, **page_options):
+        self.page_options = page_options
+        self.pages_opened = 0
+
+    async def new_page(self):
+        self.pages_opened += 1
+        return FakeSearchPage(**self.page_options)
+
+
+def make_scraper(failing_urls=(), **page_options):
+    """A scraper whose search pages are fakes and whose job details come straight from the job URL."""
+    scraper = SeekScraper()
+    scraper.context = FakeSearchContext(**page_options)
+    failing_urls = set(failing_urls)
+
+    async def extract_job_details(job_url):
+        if job_url in failing_urls:
+            return None
+        return {'job_id': job_url.rsplit('/', 1)[1], 'url': job_url, 'posting_time': 'Posted 1h ago'}
+
+    async def pause(seconds, deadline=None):
+        pass
+
+    scraper.extract_job_details = extract_job_details
+    scraper._pause = pause
+    scraper.failing_urls = failing_urls
+    return scraper
+
+
+def shard_cursor(search_url, jobs_scraped):
+    return {'search_url': search_url, 'page_url': search_url, 'page_number': 1, 'card_index': 0,
+            'jobs_scraped': jobs_scraped, 'retry_urls': [], 'finished': False}
+
+
+def test_resumed_scrape_jobs_and_scrape_sharded_both_count_num_jobs_as_a_total():
+    cursor = shard_cursor('https://www.seek.com.au/data-analyst-jobs', 3)
+    plain = asyncio.run(make_scraper().scrape_jobs(cursor['search_url'], num_jobs=7, page=FakeSearchPage(), resume_cursor=cursor))
+    sharded = asyncio.run(make_scraper().scrape_sharded(cursor['search_url'], num_jobs=7, resume_cursor=cursor))
+    assert len(plain) == len(sharded) == 4
+    assert plain.complete and sharded.complete
+
+
+def test_resumed_sharded_scrape_uses_the_total_from_the_cursor():
+    cursor = {'shards': [shard_cursor('https://www.seek.com.au/jobs/in-Victoria-VIC', 1),
+                         shard_cursor('https://www.seek.com.au/jobs/in-Tasmania-TAS', 1)],
+              'jobs_scraped': 5} #Includes jobs from shards that already finished
+    jobs = asyncio.run(make_scraper().scrape_sharded('https://www.seek.com.au/jobs', num_jobs=7, resume_cursor=cursor))
+    assert len(jobs) == 2
+    assert jobs.complete
+
+
+def test_resumed_sharded_scrape_that_already_has_num_jobs_loads_nothing():
+    scraper = make_scraper()
+    cursor = {'shards': [shard_cursor('https://www.seek.com.au/jobs/in-Victoria-VIC', 4)], 'jobs_scraped': 7}
+    jobs = asyncio.run(scraper.scrape_sharded('https://www.seek.com.au/jobs', num_jobs=7, resume_cursor=cursor))
+    assert jobs == [] and jobs.complete
+    assert scraper.context.pages_opened == 0
+
+
+def test_unfinished_sharded_scrape_resumes_up_to_num_jobs():
+    shards = ['https://www.seek.com.au/jobs/in-Victoria-VIC', 'https://www.seek.com.au/jobs/in-Tasmania-TAS']
+    scraper = make_scraper(failing_urls={'https://www.seek.com.au/job/jobs-in-Tasmania-TAS-1-0'}, pages_per_search=1)
+
+    async def plan_shards(search_url, **kwargs):
+        return shards
+
+    scraper.plan_shards = plan_shards
+    first = asyncio.run(scraper.scrape_sharded('https://www.seek.com.au/jobs'))
+    assert len(first) == 5 and not first.complete
+    assert first.resume_cursor['jobs_scraped'] == 5 #Counts the finished Victoria shard as well
+    assert [cursor['search_url'] for cursor in first.resume_cursor['shards']] == shards[1:]
+
+    scraper.failing_urls.clear()
+    resumed = asyncio.run(scraper.scrape_sharded('https://www.seek.com.au/jobs', num_jobs=6, resume_cursor=first.resume_cursor))
+    assert [job['job_id'] for job in resumed] == ['jobs-in-Tasmania-TAS-1-0']
+    assert resumed.complete
+
+
+@pytest.mark.parametrize('empty_page', [{'shows_no_results': True}, {'total_jobs': '0 jobs'}])
+def test_search_that_says_it_has_no_results_is_complete(empty_page):
+    page = FakeSearchPage(cards_load=False, **empty_page)
+    jobs = asyncio.run(make_scraper().scrape_jobs('https://www.seek.com.au/data-analyst-jobs', page=page))
+    assert jobs == [] and jobs.complete
+    assert page.loads == 1
+
+
+def test_search_page_without_job_cards_is_retried_then_partial():
+    page = FakeSearchPage(cards_load=False)
+    jobs = asyncio.run(make_scraper().scrape_jobs('https://www.seek.com.au/data-analyst-jobs', page=page))
+    assert page.loads == 3
+    assert jobs == [] and not jobs.complete
+    assert jobs.resume_cursor['page_url'] == 'https://www.seek.com.au/data-analyst-jobs'
+
+
+#Job detail pages and contexts for the job_page governor. Each context remembers how many of its pages were open
+#at once and how many were still open when it was closed.
+class FakeDetailPage:
+    def __init__(self, context):
+        self.context = context
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+        self.context.open_pages -= 1
+
+
+class FakeDetailContext:
+    def __init__(self, storage_state=None):
+        self.storage_state_in = storage_state
+        self.open_pages = 0
+        self.most_open_pages = 0
+        self.pages_opened = 0
+        self.open_pages_at_close = None
+
+    async def new_page(self):
+        assert self.open_pages_at_close is None, "page opened in a closed context"
+        self.open_pages += 1
+        self.pages_opened += 1
+        self.most_open_pages = max(self.most_open_pages, self.open_pages)
+        return FakeDetailPage(self)
+
+    async def storage_state(self):
+        return {'cookies': [{'name': 'session', 'value': str(id(self))}]}
+
+    async def close(self):
+        self.open_pages_at_close = self.open_pages
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    async def new_context(self, viewport=None, user_agent=None, storage_state=None):
+        self.contexts.append(FakeDetailContext(storage_state))
+        return self.contexts[-1]
+
+
+def make_governed_scraper(**options):
+    scraper = SeekScraper(**options)
+    scraper.browser = FakeBrowser()
+    scraper.detail_context = asyncio.run(scraper._new_context())
+    return scraper
+
+
+def test_job_page_is_closed_when_the_extraction_raises():
+    scraper = make_governed_scraper()
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            async with scraper.job_page() as page:
+                raise RuntimeError("extraction failed")
+        return page
+
+    page = asyncio.run(run())
+    assert page.closed
+    assert scraper._open_pages == 0 and scraper.detail_context.open_pages == 0
+
+
+def test_job_page_caps_open_pages_and_recycles_every_n_navigations():
+    scraper = make_governed_scraper(max_pages_per_context=2, max_navigations_per_context=5)
+
+    async def job(i):
+        async with scraper.job_page():
+            for _ in range(i % 3 + 1):
+                await asyncio.sleep(0)
+
+    async def run():
+        await asyncio.gather(*(job(i) for i in range(40)))
+
+    asyncio.run(run())
+    contexts = scraper.browser.contexts
+    assert scraper.context_recycles == 7
+    assert [context.pages_opened for context in contexts] == [5] * 8
+    assert max(context.most_open_pages for context in contexts) == 2
+    assert all(context.open_pages_at_close == 0 for context in contexts[:-1]) #Never closed under an open page
+    assert all(context.storage_state_in is not None for context in contexts[1:]) #Cookies carried over on recycle
+
+
+def test_recycle_waits_for_open_pages_to_close():
+    scraper = make_governed_scraper(max_navigations_per_context=1)
+    release = asyncio.Event()
+
+    async def run():
+        async def first_job():
+            async with scraper.job_page():
+                await release.wait()
+
+        first = asyncio.ensure_future(first_job())
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(scraper.job_page().__aenter__())
+        for _ in range(5):
+            await asyncio.sleep(0)
+        old_context = scraper.browser.contexts[0]
+        assert not second.done() and scraper.context_recycles == 0
+        assert old_context.open_pages_at_close is None
+
+        release.set()
+        await first
+        page = await second
+        assert old_context.open_pages_at_close == 0
+        assert page.context is scraper.detail_context is not old_context
+
+    asyncio.run(run())
+
+
+def test_rss_only_triggers_a_recycle_after_min_navigations(monkeypatch):
+    monkeypatch.setattr(seek_scraper_async_v6, 'process_tree_rss_mb', lambda root_pid=None: 5000.0)
+    scraper = make_governed_scraper(max_rss_mb=1000, min_navigations_per_context=3)
+
+    async def run():
+        for _ in range(3):
+            async with scraper.job_page():
+                pass
+        assert scraper.context_recycles == 0 #RSS is over the limit from the start, but the context is still new
+        async with scraper.job_page():
+            pass
+        assert scraper.context_recycles == 1
+        assert scraper._context_navigations == 1
+
+    asyncio.run(run())
+
+    monkeypatch.setattr(seek_scraper_async_v6, 'process_tree_rss_mb', lambda root_pid=None: 500.0)
+    scraper._context_navigations = 10
+    assert not scraper._detail_context_needs_recycle()
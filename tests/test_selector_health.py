@@ -0,0 +1,72 @@
+from selector_health import SelectorRegistry
+
+
+def make_registry(**kwargs):
+    return SelectorRegistry({'title': ['[data-automation="job-detail-title"]', '.j1ww7nx7']}, **kwargs)
+
+
+def miss_all(registry, times):
+    for _ in range(times):
+        for variant in registry.fields['title']:
+            registry.record('title', variant, found=False)
+        registry.record_field('title', found=False)
+
+
+def test_untried_variants_keep_registered_order():
+    registry = make_registry()
+    assert registry.ordered('title') == ['[data-automation="job-detail-title"]', '.j1ww7nx7']
+    assert registry.selector('title') == '[data-automation="job-detail-title"], .j1ww7nx7'
+
+
+def test_working_variant_is_promoted():
+    registry = make_registry()
+    for _ in range(3):
+        registry.record('title', '[data-automation="job-detail-title"]', found=False)
+        registry.record('title', '.j1ww7nx7', found=True)
+    assert registry.ordered('title')[0] == '.j1ww7nx7'
+
+
+def test_full_timeout_until_every_variant_fails():
+    registry = make_registry(failure_threshold=3, probe_timeout=2000)
+    miss_all(registry, 2)
+    assert registry.timeout_for('title', 20000) == 20000
+    miss_all(registry, 1)
+    assert registry.timeout_for('title', 20000) == 2000
+
+
+def test_one_working_variant_keeps_full_timeout():
+    registry = make_registry(failure_threshold=3)
+    for _ in range(5):
+        registry.record('title', '[data-automation="job-detail-title"]', found=False)
+        registry.record('title', '.j1ww7nx7', found=True)
+    assert registry.timeout_for('title', 20000) == 20000
+
+
+def test_a_hit_resets_the_failing_state():
+    registry = make_registry(failure_threshold=3)
+    miss_all(registry, 3)
+    registry.record('title', '.j1ww7nx7', found=True)
+    assert registry.timeout_for('title', 20000) == 20000
+
+
+def test_failing_field_gets_a_periodic_full_probe():
+    registry = make_registry(failure_threshold=1, full_probe_every=3)
+    miss_all(registry, 1)
+    timeouts = [registry.timeout_for('title', 20000) for _ in range(6)]
+    assert timeouts == [2000, 2000, 20000, 2000, 2000, 20000]
+
+
+def test_probe_timeout_never_exceeds_the_requested_timeout():
+    registry = make_registry(failure_threshold=1, probe_timeout=2000)
+    miss_all(registry, 1)
+    assert registry.timeout_for('title', 500) == 500
+
+
+def test_report_has_field_and_variant_miss_rates():
+    registry = make_registry(failure_threshold=2)
+    registry.record('title', '.j1ww7nx7', found=True)
+    registry.record_field('title', found=True)
+    miss_all(registry, 3)
+    report = registry.report()['title']
+    assert (report['hits'], report['misses'], report['miss_rate']) == (1, 3, 0.75)
+    assert report['variants']['.j1ww7nx7'] == {'hits': 1, 'misses': 3, 'miss_rate': 0.75, 'failing': True}
@@ -0,0 +1,85 @@
+from shard_planner import (
+    JOBS_PER_PAGE, MAX_PAGE_DEPTH, STATE_LOCATIONS, WORK_TYPES, JobQuota,
+    fits_under_cap, is_sorted_by_date, merge_shard_results, shard_dimensions,
+    split_by_location, split_by_query_param,
+)
+
+
+def to_days(posting_time):
+    return float(posting_time) if posting_time else float('inf')
+
+
+def test_australia_wide_search_splits_into_one_search_per_state():
+    shards = split_by_location('https://www.seek.com.au/data-analyst-jobs/in-All-Australia?sortmode=ListedDate&page=3')
+    assert len(shards) == len(STATE_LOCATIONS)
+    assert shards[0] == 'https://www.seek.com.au/data-analyst-jobs/in-New-South-Wales-NSW?sortmode=ListedDate'
+
+
+def test_search_without_location_gets_state_appended():
+    assert split_by_location('https://www.seek.com.au/jobs')[1] == 'https://www.seek.com.au/jobs/in-Victoria-VIC'
+    assert split_by_location('https://www.seek.com.au/data-analyst-jobs/')[1] == 'https://www.seek.com.au/data-analyst-jobs/in-Victoria-VIC'
+
+
+def test_narrower_or_unknown_searches_are_not_split_by_location():
+    assert split_by_location('https://www.seek.com.au/data-analyst-jobs/in-Townsville-QLD-4810') == []
+    assert split_by_location('https://www.seek.com.au/data-analyst-jobs?where=Sydney') == []
+    assert split_by_location('https://www.seek.com.au/jobs-in-australia') == []
+    assert split_by_location('https://www.seek.com.au/job/12345') == []
+
+
+def test_split_by_query_param_replaces_page_and_skips_if_already_set():
+    shards = split_by_query_param('https://www.seek.com.au/jobs?page=4', 'worktype', WORK_TYPES)
+    assert shards[0] == 'https://www.seek.com.au/jobs?worktype=242'
+    assert split_by_query_param('https://www.seek.com.au/jobs?worktype=243', 'worktype', WORK_TYPES) == []
+    assert split_by_query_param('https://www.seek.com.au/jobs', 'classification', []) == []
+
+
+def test_classification_is_only_a_dimension_when_ids_are_given():
+    assert [name for name, _ in shard_dimensions()] == ['location', 'work type']
+    assert [name for name, _ in shard_dimensions(['6281'])] == ['location', 'work type', 'classification']
+
+
+def test_fits_under_cap():
+    assert fits_under_cap(None, MAX_PAGE_DEPTH)
+    assert fits_under_cap(MAX_PAGE_DEPTH * JOBS_PER_PAGE, None)
+    assert not fits_under_cap(None, None)
+    assert not fits_under_cap(0, 0)
+    assert not fits_under_cap(MAX_PAGE_DEPTH * JOBS_PER_PAGE + 1, MAX_PAGE_DEPTH + 1)
+
+
+def test_is_sorted_by_date():
+    assert is_sorted_by_date('https://www.seek.com.au/jobs?sortmode=ListedDate')
+    assert not is_sorted_by_date('https://www.seek.com.au/jobs?sortmode=KeywordRelevance')
+
+
+def test_job_quota_is_shared_and_released_slots_are_reused():
+    quota = JobQuota(2)
+    assert quota.claim() and quota.claim()
+    assert not quota.claim()
+    quota.release()
+    assert quota.claim()
+
+
+def test_job_quota_resumed_with_claimed_jobs_only_has_the_rest():
+    quota = JobQuota(7, claimed=5)
+    assert quota.claim() and quota.claim()
+    assert not quota.claim()
+
+
+def test_job_quota_without_limit_never_runs_out():
+    quota = JobQuota(None)
+    assert all(quota.claim() for _ in range(1000))
+
+
+def test_merge_sorted_by_date_puts_newest_first_and_dedupes():
+    nsw = [{'job_id': '1', 'posting_time': '1'}, {'job_id': '2', 'posting_time': '5'}]
+    vic = [{'job_id': '3', 'posting_time': '0'}, {'job_id': '1', 'posting_time': '1'}]
+    merged = merge_shard_results([nsw, vic], newest_first=True, to_days=to_days)
+    assert [job['job_id'] for job in merged] == ['3', '1', '2']
+
+
+def test_merge_by_relevance_interleaves_shards():
+    nsw = [{'job_id': 'n1'}, {'job_id': 'n2'}, {'job_id': 'n3'}]
+    vic = [{'job_id': 'v1'}]
+    merged = merge_shard_results([nsw, vic], newest_first=False, to_days=to_days)
+    assert [job['job_id'] for job in merged] == ['n1', 'v1', 'n2', 'n3']
@@ -0,0 +1,98 @@
+import json
+import time
+
+import pytest
+
+from time_budget import (
+    JobCostEstimator, ScrapeResult, cap_timeout_ms, resolve_deadline, seconds_left, validate_resume_cursor,
+)
+
+
+def make_cursor(**overrides):
+    cursor = {
+        'search_url': 'https://www.seek.com.au/data-analyst-jobs',
+        'page_url': 'https://www.seek.com.au/data-analyst-jobs?page=2',
+        'page_number': 2,
+        'card_index': 5,
+        'jobs_scraped': 27,
+        'retry_urls': [],
+        'finished': False,
+    }
+    cursor.update(overrides)
+    return cursor
+
+
+def test_resolve_deadline_takes_the_earlier_of_deadline_and_budget():
+    now = time.time()
+    assert resolve_deadline() is None
+    assert resolve_deadline(deadline=now + 100) == now + 100
+    assert abs(resolve_deadline(time_budget=10) - (now + 10)) < 1
+    assert resolve_deadline(deadline=now + 5, time_budget=100) == now + 5
+    assert resolve_deadline(deadline=now + 100, time_budget=5) < now + 6
+
+
+def test_seconds_left_is_never_negative():
+    assert seconds_left(None) is None
+    assert seconds_left(time.time() - 10) == 0.0
+    assert 9 < seconds_left(time.time() + 10) <= 10
+
+
+def test_cap_timeout_ms():
+    assert cap_timeout_ms(15000, None) == 15000
+    assert cap_timeout_ms(15000, time.time() + 100) == 15000
+    assert 1000 < cap_timeout_ms(15000, time.time() + 2) <= 2000
+    assert cap_timeout_ms(15000, time.time() - 1) == 1 #0 would mean no timeout to playwright
+
+
+def test_estimator_starts_from_first_sample_then_smooths():
+    estimator = JobCostEstimator(initial_seconds=10, smoothing=0.5)
+    estimator.record(4)
+    assert estimator.estimate == 4
+    estimator.record(8)
+    assert estimator.estimate == 6
+
+
+def test_estimator_fits_uses_the_safety_factor():
+    estimator = JobCostEstimator(initial_seconds=10, safety_factor=2)
+    assert estimator.fits(None)
+    assert estimator.fits(time.time() + 25)
+    assert not estimator.fits(time.time() + 15)
+
+
+def test_scrape_result_is_a_list_with_completeness():
+    result = ScrapeResult([{'job_id': '1'}], complete=False, resume_cursor=make_cursor())
+    assert result == [{'job_id': '1'}]
+    assert json.loads(json.dumps(result)) == [{'job_id': '1'}]
+    assert result.complete is False
+    assert ScrapeResult().complete is True
+
+
+def test_valid_cursors_pass():
+    validate_resume_cursor(make_cursor(), sharded=False)
+    validate_resume_cursor(make_cursor(retry_urls=['https://www.seek.com.au/job/1'], finished=True), sharded=False)
+    validate_resume_cursor({'shards': [make_cursor(), make_cursor()]}, sharded=True)
+    validate_resume_cursor(make_cursor(), sharded=True) #An unsharded cursor resumes as one shard
+
+
+@pytest.mark.parametrize('cursor', [
+    None,
+    'page=2',
+    {},
+    make_cursor(page_number='2'),
+    {key: value for key, value in make_cursor().items() if key != 'page_url'},
+    make_cursor(retry_urls='https://www.seek.com.au/job/1'),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        validate_resume_cursor(cursor, sharded=False)
+
+
+def test_sharded_cursor_needs_shard_true_and_valid_shards():
+    with pytest.raises(ValueError):
+        validate_resume_cursor({'shards': [make_cursor()]}, sharded=False)
+    with pytest.raises(ValueError):
+        validate_resume_cursor({'shards': []}, sharded=True)
+    with pytest.raises(ValueError):
+        validate_resume_cursor({'shards': [{'page_number': 1}]}, sharded=True)
+    with pytest.raises(ValueError):
+        validate_resume_cursor({'shards': [make_cursor()], 'jobs_scraped': '3'}, sharded=True)
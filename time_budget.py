@@ -0,0 +1,92 @@
+import time
+from typing import Dict, List, Optional
+
+
+# Keys every single-search resume cursor has, with their types. retry_urls and finished are optional.
+CURSOR_FIELDS = {
+    'search_url': str,
+    'page_url': str,
+    'page_number': int,
+    'card_index': int,
+    'jobs_scraped': int,
+}
+
+
+def resolve_deadline(deadline: Optional[float] = None, time_budget: Optional[float] = None) -> Optional[float]:
+    """Combine an absolute deadline (epoch seconds) and a time budget (seconds from now) into the earlier deadline."""
+    deadlines = [d for d in (deadline, time.time() + time_budget if time_budget is not None else None) if d is not None]
+    return min(deadlines) if deadlines else None
+
+
+def seconds_left(deadline: Optional[float]) -> Optional[float]:
+    """Return the seconds until the deadline (never negative), or None if there is no deadline."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+
+def cap_timeout_ms(timeout_ms: int, deadline: Optional[float]) -> int:
+    """Cut a playwright timeout (ms) down to the time left before the deadline. Never returns 0, which playwright treats as no timeout."""
+    left = seconds_left(deadline)
+    if left is None:
+        return timeout_ms
+    return max(1, min(timeout_ms, int(left * 1000)))
+
+
+def _validate_search_cursor(cursor) -> None:
+    if not isinstance(cursor, dict):
+        raise ValueError("resume_cursor must be an object")
+    for key, kind in CURSOR_FIELDS.items():
+        if not isinstance(cursor.get(key), kind):
+            raise ValueError(f"resume_cursor is missing '{key}' or it has the wrong type")
+    retry_urls = cursor.get('retry_urls', [])
+    if not isinstance(retry_urls, list) or not all(isinstance(url, str) for url in retry_urls):
+        raise ValueError("resume_cursor 'retry_urls' must be a list of URLs")
+
+
+def validate_resume_cursor(cursor: Dict, sharded: bool) -> None:
+    """Raise ValueError if a resume cursor isn't one that scrape_jobs (or scrape_sharded if sharded) returned."""
+    if isinstance(cursor, dict) and 'shards' in cursor:
+        if not sharded:
+            raise ValueError("resume_cursor is from a sharded scrape, resume it with shard=true")
+        if not isinstance(cursor['shards'], list) or not cursor['shards']:
+            raise ValueError("resume_cursor 'shards' must be a non-empty list")
+        if not isinstance(cursor.get('jobs_scraped', 0), int):
+            raise ValueError("resume_cursor 'jobs_scraped' must be a number")
+        for shard_cursor in cursor['shards']:
+            _validate_search_cursor(shard_cursor)
+    else:
+        _validate_search_cursor(cursor) #A single search cursor can also be resumed with shard=true
+
+
+#Keeps a running average of how long one job detail fetch takes. Shared between runs so a new scrape
+#starts with a realistic estimate instead of a guess.
+class JobCostEstimator:
+    def __init__(self, initial_seconds: float = 10.0, smoothing: float = 0.3, safety_factor: float = 1.5):
+        self.estimate = initial_seconds
+        self.smoothing = smoothing #Weight of the newest measurement in the average
+        self.safety_factor = safety_factor #Slow pages are common, so a job is only started if it fits with this margin
+        self.samples = 0
+
+    def record(self, seconds: float):
+        if self.samples == 0:
+            self.estimate = seconds
+        else:
+            self.estimate = self.smoothing * seconds + (1 - self.smoothing) * self.estimate
+        self.samples += 1
+
+    def fits(self, deadline: Optional[float]) -> bool:
+        """Check if another job can be fetched before the deadline."""
+        if deadline is None:
+            return True
+        return time.time() + self.estimate * self.safety_factor <= deadline
+
+
+#The list of scraped jobs, plus whether the scrape got through everything it was asked for. When it didn't
+#(deadline hit, an error part way or jobs that failed to load), resume_cursor says where to carry on.
+#Still a list, so callers that only want the jobs don't need to change.
+class ScrapeResult(list):
+    def __init__(self, jobs: List[Dict] = (), complete: bool = True, resume_cursor: Optional[Dict] = None):
+        super().__init__(jobs)
+        self.complete = complete
+        self.resume_cursor = resume_cursor